@@ -4,8 +4,10 @@ Extract metadata from image-filename for images acquired with the IM04.
 This class contains a set of function to extract metadata by parsing the image file names string of images acquired on an IM04
 example filename : "-A001--PO01--LO001--CO6--SL001--PX32500--PW0080--IN0020--TM244--X014580--Y011262--Z209501--T1374031802--WE00001.tif"
 """
-from __future__ import division
-import string
+import os, re
+from typing import NamedTuple
+from functools import lru_cache
+import numpy as np
 
 magToNA = {2:0.06, 
 		   4:0.13, 
@@ -13,46 +15,173 @@ magToNA = {2:0.06,
 		   20:0.45,
 		   40:0.6}
 
+# Objective magnification for the value of the PX tag i.e pixel size in 10^-4 um, without camera binning (camera pixel of 6.5um)
+pixelSizeToMag = {32500:2,
+				  16250:4,
+				  6500:10,
+				  3250:20,
+				  1625:40}
+
+# Layout of IM04 image filenames as read by parse, compiled once in str and bytes versions (see isImageFilename)
+# Only the well id has a fixed width (letter + 3 digits), the other tags can have any number of digits
+_filenameRegex = r".[A-Z]\d{3}--PO\d+--LO\d+--CO\d+--SL\d+--PX\d+--PW\d+--IN\d+--TM\d+--X\d+--Y\d+--Z\d+--T\d+--WE\d+\.tif"
+_filenamePattern      = re.compile(_filenameRegex, re.ASCII)
+_filenamePatternBytes = re.compile(_filenameRegex.encode("ascii"))
+
+FILENAME_LENGTH = 115 # number of characters of an IM04 image filename, including the .tif extension
+
+# Character range (start, stop) of the numerical tags in the filename, and factor to convert the tag value to the metadata unit (used by parseBatch)
+# The factor is applied with the same operation as in parse (multiplication or division), such that both return the exact same values
+_batchFields = {"wellColumn"   : (2, 5, None),
+				"subposition"  : (9, 11, None),
+				"timepoint"    : (15, 18, None),
+				"channelIndex" : (22, 23, None),
+				"zSlice"       : (27, 30, None),
+				"pixelSize_um" : (34, 39, ("*", 1e-4)),
+				"lightPower"   : (43, 47, None),
+				"exposure"     : (51, 55, None),
+				"temperature"  : (59, 62, ("/", 10)),
+				"positionX_mm" : (65, 71, ("/", 1000)),
+				"positionY_mm" : (74, 80, ("/", 1000)),
+				"positionZ_um" : (83, 89, ("/", 10)),
+				"time"         : (92, 102, None),
+				"wellIndex"    : (106, 111, None),
+				"pixelSizeTag" : (34, 39, None)}
+
+class ImageMetadata(NamedTuple):
+	"""Metadata of an image, as extracted from its filename with parse."""
+	wellId       : str
+	wellRow      : int
+	wellColumn   : int
+	subposition  : int
+	timepoint    : int
+	channelIndex : int
+	zSlice       : int
+	pixelSize_um : float
+	lightPower   : int
+	exposure     : int
+	temperature  : float
+	positionX_mm : float
+	positionY_mm : float
+	positionZ_um : float
+	time         : int
+	wellIndex    : int
+	pixelSizeTag : int # integer value of the PX tag i.e pixel size in 10^-4 um, used to look up the objective
+
+@lru_cache(maxsize=4096)
+def parse(filename):
+	"""
+	Extract all metadata from the image filename at once, and return them as an ImageMetadata named tuple.
+	The filename is split only once at the "--" separators, the values are then read from each tag after its prefix (ex: PO, LO).
+	The result is cached for the last 4096 filenames, such that calling several getters for the same filename parses it only once.
+	The filename can also be bytes, as returned by os.scandir/os.listdir for a bytes directory path (ex: os.fsencode(directory)).
+	"""
+	if isinstance(filename, bytes):
+		filename = filename.decode("ascii") # the metadata strings (wellId) are returned as str
+	
+	tags = filename.split("--")
+	if len(tags) != 14:
+		raise ValueError("Filename '{}' does not follow the IM04 naming : expected 14 tags separated by '--' as in '-A001--PO01--LO001--CO6--SL001--PX32500--PW0080--IN0020--TM244--X014580--Y011262--Z209501--T1374031802--WE00001.tif'".format(filename))
+	
+	well, subposition, timepoint, channel, zSlice, pixelSize, power, exposure, temperature, x, y, z, time, wellIndex = tags
+	
+	return ImageMetadata(wellId       = well[1:5],
+						 wellRow      = ord(well[1]) - 64, # alphabetical order, ord("A") = 65 so A=1
+						 wellColumn   = int(well[2:5]),
+						 subposition  = int(subposition[2:]),
+						 timepoint    = int(timepoint[2:]),
+						 channelIndex = int(channel[2:]),
+						 zSlice       = int(zSlice[2:]),
+						 pixelSize_um = float(pixelSize[2:])*1e-4,
+						 lightPower   = int(power[2:]),
+						 exposure     = int(exposure[2:]),
+						 temperature  = float(temperature[2:])/10,
+						 positionX_mm = int(x[1:])/1000,
+						 positionY_mm = int(y[1:])/1000,
+						 positionZ_um = float(z[1:])/10,
+						 time         = int(time[1:]),
+						 wellIndex    = int(wellIndex[2:-4]), # skip the .tif extension
+						 pixelSizeTag = int(pixelSize[2:]))
+
 def getPositionXY_mm(filename):
 	"""Extract the XY-axis coordinates (in mm) from the image filename. The coordinates corresponds to the objective XY coordinate and the center of the image if using the full field of view of the camera."""
-	# Parse string + do conversion
-	x0mm = int(filename[65:71]) /1000 # >0
-	y0mm = int(filename[74:80]) /1000
-	
-	return x0mm, y0mm
+	metadata = parse(filename)
+	return metadata.positionX_mm, metadata.positionY_mm
+
+def isImageFilename(filename):
+	"""
+	Check if the filename (str or bytes) follows the naming of IM04 images, ex: to skip other files in a dataset directory.
+	The full filename is checked within a single regular-expression match, accepting the same tag layout as parse : the well id is a letter followed by 3 digits, the other tags can have any number of digits.
+	Note that parseBatch is stricter, it requires the exact tag widths of IM04 filenames (115 characters).
+	"""
+	pattern = _filenamePatternBytes if isinstance(filename, bytes) else _filenamePattern
+	return pattern.fullmatch(filename) is not None
+
+def iterImages(directory):
+	"""
+	Iterate over the IM images of a directory (not recursive) and yield (entry, metadata) tuples, with the os.DirEntry of the image file and its ImageMetadata.
+	The directory is scanned lazily with os.scandir, such that large datasets are not listed in memory at once.
+	Files which are not named as IM images are skipped, see isImageFilename.
+	The directory can be a str or bytes path, see parse.
+	"""
+	with os.scandir(directory) as entries:
+		for entry in entries:
+			if isImageFilename(entry.name) and entry.is_file():
+				yield entry, parse(entry.name)
 
 def getWellSubPosition(filename):
 	"""Extract the index corresponding to the subposition for that well."""
-	return int(filename[9:11])
+	return parse(filename).subposition
 
 def getPositionZ_um(filename):
 	"""Extract the Z-axis coordinates (in um)."""
-	return float(filename[83:89])/10
+	return parse(filename).positionZ_um
 	
 def getPixelSize_um(filename):
 	"""Extract the pixel size (in um) from the filename."""
-	return float(filename[34:39])*10**-4
+	return parse(filename).pixelSize_um
+	
+def getObjectiveMagnification(filename):
+	"""
+	Return the magnification of the objective used to acquire the image (ex: 4 for the 4X objective), deduced from the pixel size.
+	This assumes that the image was acquired without camera binning.
+	"""
+	pixelSizeTag = parse(filename).pixelSizeTag # integer value as read from the filename, no conversion through float
 	
+	try:
+		return pixelSizeToMag[pixelSizeTag]
+	
+	except KeyError:
+		raise ValueError("No objective magnification known for pixel size tag PX{:05d} (images acquired with camera binning ?).".format(pixelSizeTag)) from None
+
+def getObjectiveNA(filename):
+	"""Return the numerical aperture of the objective used to acquire the image, see getObjectiveMagnification."""
+	return magToNA[getObjectiveMagnification(filename)]
+
 def getWellId(filename):
 	"""Extract well Id (ex:A001) from the filename (for IM4)."""
-	return filename[1:5]
+	return parse(filename).wellId
 
 def getWellColumn(filename):
-	"""Extract well column (1-12) from the filename (for IM4)."""
-	return int(filename[2:5])
+	"""Extract well column from the filename (for IM4), ex: 1-12 for a 96-well plate, 1-24 for a 384-well plate."""
+	return parse(filename).wellColumn
 
 def getWellRow(filename):
-	"""Extract well row (1-8) from the filename (for IM4)."""
-	letter = filename[1:2]
-	return string.ascii_uppercase.index(letter)+1 # alphabetical order +1 since starts at 0
+	"""Extract well row as an integer from the filename (for IM4), with A=1 ex: 1-8 for a 96-well plate, 1-16 for a 384-well plate."""
+	return parse(filename).wellRow
+
+def getWellRowColumn(filename):
+	"""Extract the well row and column as a tuple of integers, ex: (1,1) for A001, see getWellRow and getWellColumn."""
+	metadata = parse(filename)
+	return metadata.wellRow, metadata.wellColumn
 
 def getWellIndex(filename):
 	"""Return well number corresponding to order of acquisition by the IM (snake pattern)."""
-	return int(filename[106:111]) 
+	return parse(filename).wellIndex
 	
 def getZSlice(filename):
 	"""Return image slice number of the associated Z-Stack serie."""
-	return int(filename[27:30])
+	return parse(filename).zSlice
 
 def getChannelIndex(filename):
     """
@@ -62,27 +191,27 @@ def getChannelIndex(filename):
     3 = FITC (GFP...)
     5 = TRITC (mCherry...)
     """
-    return int(filename[22:23])
+    return parse(filename).channelIndex
 
 def getTimepoint(filename):
 	"""Return the integer index corresponding to the image timepoint."""
-	return int(filename[15:18])
+	return parse(filename).timepoint
 
 def getTime(filename):
     """Return the time at which the image was recorded."""
-    return int(filename[92:102])
+    return parse(filename).time
     
 def getLightPower(filename):
 	"""Return relative power (%) used for the acquisition with this channel."""
-	return int(filename[43:47])
+	return parse(filename).lightPower
 	
 def getExposure(filename):
 	"""Return exposure time in ms used for the acquisition with this channel."""
-	return int(filename[51:55])
+	return parse(filename).exposure
 
 def getTemperature(filename):
 	"""Return temperature in celsius degrees as measured by the probe at time of acquisition."""
-	return float(filename[59:62])/10
+	return parse(filename).temperature
 
 def convertXY_PixToIM(Xpix, Ypix, PixelSize_um, X0mm, Y0mm, Image_Width=2048, Image_Height=2048):
 	"""
@@ -92,8 +221,8 @@ def convertXY_PixToIM(Xpix, Ypix, PixelSize_um, X0mm, Y0mm, Image_Width=2048, Im
 	----------
 	Xpix, Ypix : int 
 		pixel coordinates of the item (its center) in the image
-	PixelSize  : float
-		size of one pixel in mm for the image
+	PixelSize_um : float
+		size of one pixel in um for the image
 	X0mm, Y0mm : float
 		the IM axis coordinates in mm for the center of the image
 	Image_Width, Image_Height : int
@@ -104,12 +233,94 @@ def convertXY_PixToIM(Xpix, Ypix, PixelSize_um, X0mm, Y0mm, Image_Width=2048, Im
 	Xout, Yout: float
 		X,Y Coordinates of the item in IM standards
 	"""
-	# Do the conversion
-	Xout = X0mm + (-Image_Width/2  + Xpix)*PixelSize_um*10**-3        	     # result in mm
-	Yout = Y0mm + (-Image_Height/2 + Image_Height -Ypix)*PixelSize_um*10**-3 # Consider for Y the 0 pixel coordinates at the image bottom (ie Y axis oriented towards the top). From the image center, substract half the image towards the bottom (-Image_Height/2, we are now at the image bottom), then add the Image height (+ Image_Height, we are at the image top) then substract the Y center to go down to the y item coordinates
+	# Do the conversion, result in mm
+	# Multiply by the pixel size first, then convert to mm : with integer pixel offsets this product is exact, leaving a single rounding step
+	Xout = X0mm + (Xpix - Image_Width/2)*PixelSize_um*1e-3
+	Yout = Y0mm + (Image_Height/2 - Ypix)*PixelSize_um*1e-3 # Y pixel coordinates oriented from the image top to the bottom, opposite to the IM Y axis
 	
 	# Allow only 3 decimal (in jobs file)
 	Xout = round(Xout,3) 
 	Yout = round(Yout,3)
 	
-	return Xout, Yout
\ No newline at end of file
+	return Xout, Yout
+
+def convertXY_PixToIM_batch(Xpix, Ypix, PixelSize_um, X0mm, Y0mm, Image_Width=2048, Image_Height=2048):
+	"""
+	Same as convertXY_PixToIM, but for arrays of pixel coordinates ex: for all items detected in an image.
+	The results are identical to calling convertXY_PixToIM for each item : same order of operations and same rounding as the python round function.
+	
+	Parameters
+	----------
+	Xpix, Ypix : array-like of int
+		pixel coordinates of the items (their center) in the image, both of the same length
+	PixelSize_um, X0mm, Y0mm, Image_Width, Image_Height : 
+		see convertXY_PixToIM, scalar values for the image, or arrays with one value per item
+	
+	Returns
+	-------
+	Xout, Yout: numpy arrays of float
+		X,Y Coordinates of the items in IM standards, rounded to 3 decimals
+	"""
+	# Same order of operations as convertXY_PixToIM, to get the exact same values
+	Xout = X0mm + (np.asarray(Xpix) - Image_Width/2)*PixelSize_um*1e-3
+	Yout = Y0mm + (Image_Height/2 - np.asarray(Ypix))*PixelSize_um*1e-3 # Y pixel coordinates oriented from the image top to the bottom, opposite to the IM Y axis
+	
+	# Allow only 3 decimal (in jobs file)
+	# np.round scales by 1000 and rounds half to even, which can differ from round for values close to a half, hence the python round
+	Xout = np.array([round(x, 3) for x in Xout.tolist()])
+	Yout = np.array([round(y, 3) for y in Yout.tolist()])
+	
+	return Xout, Yout
+
+def parseBatch(filenames):
+	"""
+	Extract the metadata of several image filenames at once, as numpy arrays.
+	
+	The filenames are stacked in a 2D array of characters, such that each metadata is converted for all filenames in one go.
+	This is much faster than calling the individual getters in a loop, when indexing a full dataset.
+	
+	Parameters
+	----------
+	filenames : iterable of str or iterable of bytes
+		image filenames (not the full path), they must all be 115-character long as for IM04 images.
+		bytes filenames (ex: from os.scandir(os.fsencode(directory))) are used as such, without encoding.
+	
+	Returns
+	-------
+	dict of numpy arrays
+		one array per metadata, with the same keys as the fields of ImageMetadata ex: "wellId", "positionX_mm"...
+		The array values are in the same order as the filenames.
+	"""
+	filenames = list(filenames)
+	
+	for filename in filenames:
+		if len(filename) != FILENAME_LENGTH:
+			raise ValueError("Filename should be {}-character long, got '{}'".format(FILENAME_LENGTH, filename))
+	
+	if filenames and isinstance(filenames[0], bytes):
+		buffer = b"".join(filenames)
+	else:
+		buffer = "".join(filenames).encode("ascii")
+	
+	chars = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, FILENAME_LENGTH)
+	
+	metadata = {}
+	metadata["wellId"]  = np.ascontiguousarray(chars[:, 1:5]).view("S4")[:, 0].astype(str)
+	metadata["wellRow"] = chars[:, 1].astype(np.int64) - ord("A") + 1
+	
+	for key, (start, stop, factor) in _batchFields.items():
+		
+		digits = chars[:, start:stop] - ord("0") # non-digit characters wrap around to values >9 (unsigned)
+		if (digits > 9).any():
+			raise ValueError("Non-numerical character in the '{}' tag (characters {}-{}) of a filename.".format(key, start, stop))
+		
+		values = digits @ 10**np.arange(stop-start-1, -1, -1, dtype=np.int64) # one integer per filename
+		
+		if factor is None:
+			metadata[key] = values
+		
+		else:
+			operation, number = factor
+			metadata[key] = values*number if operation == "*" else values/number
+	
+	return metadata
@@ -104,6 +104,10 @@ def checkZstackParameters(zStackCenter, nSlices, zStepSize):
 
 class TcpIp(object):
 	"""Object representing an active TcpIp connection to the Imaging Machine Control Software for remote control."""
+	
+	liveModeCacheDuration = 0.1 # seconds during which the live mode state is reused without querying the IM, see isLiveModeActive
+	
+	_cmdLiveModeActive = b"LiveModeActive()" # encoded once, this query is sent by all the mode getters
 
 	def __init__(self, port=6200):
 		"""Initialize a TCP/IP socket for the exchange of commands."""
@@ -117,7 +121,13 @@ class TcpIp(object):
 			"Also make sure that the option 'Block remote connection' of the admin panel is deactivated, and that the port numbers match (here set to {}).".format(port))
 			raise socket.error(msg)
 		
+		# Commands are short strings sent one at a time, send them right away instead of letting Nagle's algorithm buffer them
+		self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		
 		self._isConnected = True # only False once socket is closed
+		self._liveModeActive = None
+		self._liveModeTimestamp = None # time of the last LiveModeActive query, reset when any other command is sent
+		self._setFeedbackBuffer(256)
 		print("Connected to IM on port {}, in {} mode.".format(port, self.getMode()))
 
 	def closeConnection(self):
@@ -139,12 +149,16 @@ class TcpIp(object):
 	def sendCommand(self, stringCommand):
 		"""
 		Send a string command to the IM and wait 50ms for processing of the command.
-		The command is converted to a bytearray before sending.
+		The command is encoded to ascii bytes before sending, constant commands can also be passed as already encoded bytes.
 		""" 
 		if not self._isConnected:
 			raise socket.error("Connection to IM was closed. Create a new IM object to establish a new connection.")
 		
-		self._socket.sendall(bytearray(stringCommand, "ascii"))
+		if isinstance(stringCommand, str):
+			stringCommand = stringCommand.encode("ascii")
+		
+		self._socket.sendall(stringCommand)
+		self._liveModeTimestamp = None # the command might change the mode, dont reuse the cached state
 		time.sleep(0.05) # wait 50ms, before sending another command (which is usually whats done next, e.g. with _getFeedback
 
 	def checkLidClosed(self):
@@ -152,13 +166,25 @@ class TcpIp(object):
 		if self.isLidOpened():
 			raise Exception("Lid is opened !")
 
+	def _setFeedbackBuffer(self, nbytes):
+		"""Allocate the buffer receiving the feedback from the IM, it is reused for every feedback."""
+		self._feedbackBuffer = bytearray(nbytes)
+		self._feedbackView = memoryview(self._feedbackBuffer)
+
 	def _getFeedback(self, nbytes=256):
 		"""
 		Tries to read at max nbytes back from IM and convert to a string.
 		This should be called after "get" commands.
 		Calling this function will block execution (ie the function wont return), until at least one byte is available for reading.
 		"""
-		return self._socket.recv(nbytes).decode("ascii")
+		if not isPositiveInteger(nbytes): # recv_into would read up to the full buffer size for nbytes=0
+			raise ValueError("nbytes must be a strictly positive integer.")
+		
+		if nbytes > len(self._feedbackBuffer):
+			self._setFeedbackBuffer(nbytes)
+		
+		n = self._socket.recv_into(self._feedbackView, nbytes)
+		return str(self._feedbackView[:n], "ascii")
 
 	def _waitForFinished(self):
 		"""
@@ -203,22 +229,33 @@ class TcpIp(object):
 		"""Check if lid is opened."""
 		return self._getBooleanValue("LidOpened()")
 
-	def getMode(self):
-		"""Return current acquisition mode either "live" or "script"."""
-		return "live" if self._getBooleanValue("LiveModeActive()") else "script"
+	def getMode(self, force=False):
+		"""Return current acquisition mode either "live" or "script", see isLiveModeActive for the force option."""
+		return "live" if self.isLiveModeActive(force) else "script"
 
-	def isScriptRunning(self):
+	def isScriptRunning(self, force=False):
 		"""
 		Check if a script is running i.e when LiveMode is not active.
 		If a script is running, tcpip commands should not be sent (except to ask for the machine state).
+		See isLiveModeActive for the force option.
 		"""
-		return not self._getBooleanValue("LiveModeActive()")
+		return not self.isLiveModeActive(force)
 
-	def isLiveModeActive(self):
+	def isLiveModeActive(self, force=False):
 		"""
 		Check if live mode is active, i.e no script is running and tcpip commands can be sent.
+		
+		To absorb polling loops, the state returned by the IM is reused for liveModeCacheDuration (0.1 second), as long as no other command is sent in between.
+		Use force=True to always query the IM, this is what the internal checks deciding whether to switch mode do.
 		"""
-		return self._getBooleanValue("LiveModeActive()")
+		if (force 
+			or self._liveModeTimestamp is None 
+			or time.monotonic() - self._liveModeTimestamp > self.liveModeCacheDuration):
+			
+			self._liveModeActive = self._getBooleanValue(self._cmdLiveModeActive)
+			self._liveModeTimestamp = time.monotonic() # after sending the command, which resets the timestamp
+		
+		return self._liveModeActive
 
 	def isTemperatureRegulated(self):
 		return self._getBooleanValue("GetTemperatureRegulation()")
@@ -653,7 +690,7 @@ class TcpIp(object):
 		"""
 		self.checkLidClosed()
 		
-		if self.getMode() == "live":
+		if self.getMode(force=True) == "live":
 			self.sendCommand("SetBrightField(1, 1, 0, 0, 0, false)") # any channel, filter should do, as long as intensity is 0
 			print("Switched-off brightfield light-source.")
 			self._waitForFinished()
@@ -709,7 +746,7 @@ class TcpIp(object):
 		"""
 		self.checkLidClosed()
 		
-		if self.getMode() == "live":
+		if self.getMode(force=True) == "live":
 			self.sendCommand("SetFluoChannel(1, \"111111\", 1, 0, 0, 0, false)")
 			print("Switch-off fluorescent light sources.")
 			self._waitForFinished()
@@ -859,7 +896,7 @@ class TcpIp(object):
 		
 		print(cmd) # Should appear as top-level command before subcommands are called within Acquire
 		
-		mode0 = self.getMode() # if we want to go back to live mode
+		mode0 = self.getMode(force=True) # if we want to go back to live mode
 		self.setMode("script") # for acquire to work, needs to be in script mode
 		
 		# Set objective and light source AFTER switching to script mode
@@ -883,7 +920,7 @@ class TcpIp(object):
 		Switch to setting mode true/false, needed by software AF in live mode.
 		Does not do anything is script mode.
 		"""
-		if self.getMode() == "script":
+		if self.getMode(force=True) == "script":
 			return
 		
 		cmd = "SettingModeOn()" if state else "SettingModeOff()"
@@ -906,7 +943,7 @@ class TcpIp(object):
 		mode = mode.lower() # make it case-insensitive
 		
 		# Check current mode, this prevent error message from IM when switching to current mode
-		if mode == self.getMode(): # actually returns only live/script not setting
+		if mode == self.getMode(force=True): # actually returns only live/script not setting
 			return
 		
 		if mode == "script":
@@ -994,7 +1031,7 @@ class TcpIp(object):
 		
 		self.setObjective(objective)
 
-		mode = self.getMode()
+		mode = self.getMode(force=True)
 		
 		if mode == "live":
 			self._setSettingMode(True) # in live mode, setting must be on
@@ -2,7 +2,6 @@
 This module provides a set of utility functions when working with IM datasets.
 It includes loading IM datasets as multi-dimensional array in python...
 """
-import os
 import numpy as np
 
 def checkWellID(wellID:str):
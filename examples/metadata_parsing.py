@@ -12,6 +12,7 @@ print("\nWell Id :", metadata.getWellId(filename))
 
 print ("Plate column :", metadata.getWellColumn(filename))
 print ("Plate row :",    metadata.getWellRow(filename))
+print ("Plate row, column :", metadata.getWellRowColumn(filename))
 
 print ("Well subposition :", metadata.getWellSubPosition(filename))
 
@@ -29,7 +30,16 @@ print ("Exposure time (ms) :", metadata.getExposure(filename))
 print ("Channel index :", metadata.getChannelIndex(filename)) 
 
 print ("Pixel Size (um): ", metadata.getPixelSize_um(filename))
+print ("Objective magnification and NA : ", metadata.getObjectiveMagnification(filename), metadata.getObjectiveNA(filename))
 
 print ("Timepoint :", metadata.getTimepoint(filename))
 
-print ("Temperature (Celsius)", metadata.getTemperature(filename))
\ No newline at end of file
+print ("Temperature (Celsius)", metadata.getTemperature(filename))
+
+# Parse several filenames at once, this returns a dictionary of numpy arrays (one value per filename)
+filenames = [filename,
+			 "-B003--PO02--LO002--CO1--SL001--PX32500--PW0040--IN0030--TM281--X032843--Y020313--Z192001--T0200263097--WE00022.tif"]
+
+batch = metadata.parseBatch(filenames)
+print ("\nWell Ids :", batch["wellId"])
+print ("Positions X (mm) :", batch["positionX_mm"])
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+Check that convertXY_PixToIM_batch returns the same coordinates as convertXY_PixToIM called for each item.
+Random but realistic inputs : pixel coordinates in a 2048x2048 image, pixel sizes of the IM objectives, objective coordinates within the plate range.
+"""
+import random
+import numpy as np
+from acquifer import metadata
+
+def generateInputs(n=200000, seed=0):
+	"""Return arrays Xpix, Ypix, PixelSize_um, X0mm, Y0mm with n random values each."""
+	generator = random.Random(seed)
+	
+	Xpix = [generator.randint(0, 2047) for _ in range(n)]
+	Ypix = [generator.randint(0, 2047) for _ in range(n)]
+	PixelSize_um = [generator.choice((3.25, 1.625, 0.65, 0.325, 0.1625)) for _ in range(n)]
+	X0mm = [round(generator.uniform(5, 120), 3) for _ in range(n)]
+	Y0mm = [round(generator.uniform(5, 80), 3) for _ in range(n)]
+	
+	return Xpix, Ypix, PixelSize_um, X0mm, Y0mm
+
+def test_batchMatchesScalar():
+	inputs = generateInputs()
+	
+	Xbatch, Ybatch = metadata.convertXY_PixToIM_batch(*(np.array(values) for values in inputs))
+	
+	for i, item in enumerate(zip(*inputs)):
+		assert metadata.convertXY_PixToIM(*item) == (Xbatch[i], Ybatch[i]), "Mismatch for inputs {}".format(item)
+
+def test_roundingCloseToHalf():
+	# 64.7445 is stored as 64.74450000000000216..., np.round would give 64.744
+	assert metadata.convertXY_PixToIM(1577, 1722, 3.25, 33.936, 67.013) == (35.733, 64.745)
+	
+	Xout, Yout = metadata.convertXY_PixToIM_batch([1577], [1722], 3.25, 33.936, 67.013)
+	assert (Xout[0], Yout[0]) == (35.733, 64.745)
+
+if __name__ == "__main__":
+	test_batchMatchesScalar()
+	test_roundingCloseToHalf()
+	print("convertXY_PixToIM_batch matches convertXY_PixToIM")